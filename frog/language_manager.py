@@ -28,20 +28,157 @@
 
 import os
 import pathlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property
 from gettext import gettext as _
+from operator import itemgetter
 from shutil import copyfile
-from typing import List, Dict
-from urllib import request
+from typing import List, Dict, Set, Tuple
 
-from gi.repository import GObject
+import urllib3
+from gi.repository import GLib, GObject
 from loguru import logger
 
 from frog.config import tessdata_dir, tessdata_url, tessdata_best_url
-from frog.gobject_worker import GObjectWorker
 from frog.types.download_state import DownloadState
 from frog.types.language_item import LanguageItem
 
 
+def N_(message: str) -> str:
+    return message
+
+
+# Tesseract language codes paired with their English names. The names are only
+# marked for extraction here and get translated on first access. Pairs are kept
+# sorted by English name, so sorting the translations is cheap for most locales.
+_LANGUAGES = tuple(sorted((
+    ("afr", N_("Afrikaans")),
+    ("amh", N_("Amharic")),
+    ("ara", N_("Arabic")),
+    ("asm", N_("Assamese")),
+    ("aze", N_("Azerbaijani")),
+    ("aze_cyrl", N_("Azerbaijani - Cyrilic")),
+    ("bel", N_("Belarusian")),
+    ("ben", N_("Bengali")),
+    ("bod", N_("Tibetan")),
+    ("bos", N_("Bosnian")),
+    ("bre", N_("Breton")),
+    ("bul", N_("Bulgarian")),
+    ("cat", N_("Catalan; Valencian")),
+    ("ceb", N_("Cebuano")),
+    ("ces", N_("Czech")),
+    ("chi_sim", N_("Chinese - Simplified")),
+    ("chi_tra", N_("Chinese - Traditional")),
+    ("chr", N_("Cherokee")),
+    ("cos", N_("Corsican")),
+    ("cym", N_("Welsh")),
+    ("dan", N_("Danish")),
+    ("deu", N_("German")),
+    ("dzo", N_("Dzongkha")),
+    ("ell", N_("Greek, Modern (1453-)")),
+    ("eng", N_("English")),
+    ("enm", N_("English, Middle (1100-1500)")),
+    ("epo", N_("Esperanto")),
+    ("equ", N_("Math / equation detection module")),
+    ("est", N_("Estonian")),
+    ("eus", N_("Basque")),
+    ("fao", N_("Faroese")),
+    ("fas", N_("Persian")),
+    ("fil", N_("Filipino (old - Tagalog)")),
+    ("fin", N_("Finnish")),
+    ("fra", N_("French")),
+    ("deu_latf", N_("German - Fraktur")),
+    ("frm", N_("French, Middle (ca.1400-1600)")),
+    ("fry", N_("Western Frisian")),
+    ("gla", N_("Scottish Gaelic")),
+    ("gle", N_("Irish")),
+    ("glg", N_("Galician")),
+    ("grc", N_("Greek, Ancient (to 1453) (contrib)")),
+    ("guj", N_("Gujarati")),
+    ("hat", N_("Haitian; Haitian Creole")),
+    ("heb", N_("Hebrew")),
+    ("hin", N_("Hindi")),
+    ("hrv", N_("Croatian")),
+    ("hun", N_("Hungarian")),
+    ("hye", N_("Armenian")),
+    ("iku", N_("Inuktitut")),
+    ("ind", N_("Indonesian")),
+    ("isl", N_("Icelandic")),
+    ("ita", N_("Italian")),
+    ("ita_old", N_("Italian - Old")),
+    ("jav", N_("Javanese")),
+    ("jpn", N_("Japanese")),
+    ("jpn_vert", N_("Japanese (vertical)")),
+    ("kan", N_("Kannada")),
+    ("kat", N_("Georgian")),
+    ("kat_old", N_("Georgian - Old")),
+    ("kaz", N_("Kazakh")),
+    ("khm", N_("Central Khmer")),
+    ("kir", N_("Kirghiz; Kyrgyz")),
+    ("kmr", N_("Kurmanji (Kurdish - Latin Script)")),
+    ("kor", N_("Korean")),
+    ("kor_vert", N_("Korean (vertical)")),
+    ("lao", N_("Lao")),
+    ("lat", N_("Latin")),
+    ("lav", N_("Latvian")),
+    ("lit", N_("Lithuanian")),
+    ("ltz", N_("Luxembourgish")),
+    ("mal", N_("Malayalam")),
+    ("mar", N_("Marathi")),
+    ("mkd", N_("Macedonian")),
+    ("mlt", N_("Maltese")),
+    ("mon", N_("Mongolian")),
+    ("mri", N_("Maori")),
+    ("msa", N_("Malay")),
+    ("mya", N_("Burmese")),
+    ("nep", N_("Nepali")),
+    ("nld", N_("Dutch; Flemish")),
+    ("nor", N_("Norwegian")),
+    ("oci", N_("Occitan (post 1500)")),
+    ("ori", N_("Oriya")),
+    ("osd", N_("Orientation and script detection module")),
+    ("pan", N_("Panjabi; Punjabi")),
+    ("pol", N_("Polish")),
+    ("por", N_("Portuguese")),
+    ("pus", N_("Pushto; Pashto")),
+    ("que", N_("Quechua")),
+    ("ron", N_("Romanian; Moldavian; Moldovan")),
+    ("rus", N_("Russian")),
+    ("san", N_("Sanskrit")),
+    ("sin", N_("Sinhala; Sinhalese")),
+    ("slk", N_("Slovak")),
+    ("slv", N_("Slovenian")),
+    ("snd", N_("Sindhi")),
+    ("spa", N_("Spanish; Castilian")),
+    ("spa_old", N_("Spanish; Castilian - Old")),
+    ("sqi", N_("Albanian")),
+    ("srp", N_("Serbian")),
+    ("srp_latn", N_("Serbian - Latin")),
+    ("sun", N_("Sundanese")),
+    ("swa", N_("Swahili")),
+    ("swe", N_("Swedish")),
+    ("syr", N_("Syriac")),
+    ("tam", N_("Tamil")),
+    ("tat", N_("Tatar")),
+    ("tel", N_("Telugu")),
+    ("tgk", N_("Tajik")),
+    ("tha", N_("Thai")),
+    ("tir", N_("Tigrinya")),
+    ("ton", N_("Tonga")),
+    ("tur", N_("Turkish")),
+    ("uig", N_("Uighur; Uyghur")),
+    ("ukr", N_("Ukrainian")),
+    ("urd", N_("Urdu")),
+    ("uzb", N_("Uzbek")),
+    ("uzb_cyrl", N_("Uzbek - Cyrilic")),
+    ("vie", N_("Vietnamese")),
+    ("yid", N_("Yiddish")),
+    ("yor", N_("Yoruba")),
+), key=itemgetter(1)))
+
+
 class LanguageManager(GObject.GObject):
     __gtype_name__ = 'LanguageManager'
 
@@ -52,152 +189,87 @@ class LanguageManager(GObject.GObject):
         'removed': (GObject.SIGNAL_RUN_FIRST, None, (str,)),
     }
 
-    _active_language: LanguageItem = LanguageItem(code='eng', title=_("English"))
+    # Shared by all downloads so connections to GitHub are kept alive. Timeouts
+    # are short and reads are never retried, as they bound how long a stalled
+    # download can hold up exit.
+    _pool = urllib3.PoolManager(maxsize=4, retries=urllib3.Retry(total=2, read=0),
+                                timeout=urllib3.Timeout(connect=5, read=10))
+    # Bounds the number of simultaneous downloads
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tessdata')
+    _shutting_down = threading.Event()
+    # Responses being streamed, so shutdown() can break their blocking reads
+    _responses: Set[urllib3.BaseHTTPResponse] = set()
+    _responses_lock = threading.Lock()
+
+    _active_language: LanguageItem | None = None
 
     def __init__(self):
         super().__init__()
 
+        # Created here rather than at import so the title is translated
+        # with the locale already set up
+        self._active_language = LanguageItem(code='eng', title=_("English"))
+
         self.loading_languages: Dict[str, DownloadState] = dict()
 
-        # Cached codes of downloaded languages
-        self._downloaded_codes = []
+        # Cached codes of downloaded languages, sorted by title, and the
+        # tessdata dir mtime they were read at
+        self._downloaded_codes: Tuple[str, ...] = ()
+        self._downloaded_mtime = None
         self._need_update_cache = True
 
-        self._languages = dict()
-        self._languages["afr"] = _("Afrikaans")
-        self._languages["amh"] = _("Amharic")
-        self._languages["ara"] = _("Arabic")
-        self._languages["asm"] = _("Assamese")
-        self._languages["aze"] = _("Azerbaijani")
-        self._languages["aze_cyrl"] = _("Azerbaijani - Cyrilic")
-        self._languages["bel"] = _("Belarusian")
-        self._languages["ben"] = _("Bengali")
-        self._languages["bod"] = _("Tibetan")
-        self._languages["bos"] = _("Bosnian")
-        self._languages["bre"] = _("Breton")
-        self._languages["bul"] = _("Bulgarian")
-        self._languages["cat"] = _("Catalan; Valencian")
-        self._languages["ceb"] = _("Cebuano")
-        self._languages["ces"] = _("Czech")
-        self._languages["chi_sim"] = _("Chinese - Simplified")
-        self._languages["chi_tra"] = _("Chinese - Traditional")
-        self._languages["chr"] = _("Cherokee")
-        self._languages["cos"] = _("Corsican")
-        self._languages["cym"] = _("Welsh")
-        self._languages["dan"] = _("Danish")
-        self._languages["deu"] = _("German")
-        self._languages["dzo"] = _("Dzongkha")
-        self._languages["ell"] = _("Greek, Modern (1453-)")
-        self._languages["eng"] = _("English")
-        self._languages["enm"] = _("English, Middle (1100-1500)")
-        self._languages["epo"] = _("Esperanto")
-        self._languages["equ"] = _("Math / equation detection module")
-        self._languages["est"] = _("Estonian")
-        self._languages["eus"] = _("Basque")
-        self._languages["fao"] = _("Faroese")
-        self._languages["fas"] = _("Persian")
-        self._languages["fil"] = _("Filipino (old - Tagalog)")
-        self._languages["fin"] = _("Finnish")
-        self._languages["fra"] = _("French")
-        self._languages["deu_latf"] = _("German - Fraktur")
-        self._languages["frm"] = _("French, Middle (ca.1400-1600)")
-        self._languages["fry"] = _("Western Frisian")
-        self._languages["gla"] = _("Scottish Gaelic")
-        self._languages["gle"] = _("Irish")
-        self._languages["glg"] = _("Galician")
-        self._languages["grc"] = _("Greek, Ancient (to 1453) (contrib)")
-        self._languages["guj"] = _("Gujarati")
-        self._languages["hat"] = _("Haitian; Haitian Creole")
-        self._languages["heb"] = _("Hebrew")
-        self._languages["hin"] = _("Hindi")
-        self._languages["hrv"] = _("Croatian")
-        self._languages["hun"] = _("Hungarian")
-        self._languages["hye"] = _("Armenian")
-        self._languages["iku"] = _("Inuktitut")
-        self._languages["ind"] = _("Indonesian")
-        self._languages["isl"] = _("Icelandic")
-        self._languages["ita"] = _("Italian")
-        self._languages["ita_old"] = _("Italian - Old")
-        self._languages["jav"] = _("Javanese")
-        self._languages["jpn"] = _("Japanese")
-        self._languages["jpn_vert"] = _("Japanese (vertical)")
-        self._languages["kan"] = _("Kannada")
-        self._languages["kat"] = _("Georgian")
-        self._languages["kat_old"] = _("Georgian - Old")
-        self._languages["kaz"] = _("Kazakh")
-        self._languages["khm"] = _("Central Khmer")
-        self._languages["kir"] = _("Kirghiz; Kyrgyz")
-        self._languages["kmr"] = _("Kurmanji (Kurdish - Latin Script)")
-        self._languages["kor"] = _("Korean")
-        self._languages["kor_vert"] = _("Korean (vertical)")
-        self._languages["lao"] = _("Lao")
-        self._languages["lat"] = _("Latin")
-        self._languages["lav"] = _("Latvian")
-        self._languages["lit"] = _("Lithuanian")
-        self._languages["ltz"] = _("Luxembourgish")
-        self._languages["mal"] = _("Malayalam")
-        self._languages["mar"] = _("Marathi")
-        self._languages["mkd"] = _("Macedonian")
-        self._languages["mlt"] = _("Maltese")
-        self._languages["mon"] = _("Mongolian")
-        self._languages["mri"] = _("Maori")
-        self._languages["msa"] = _("Malay")
-        self._languages["mya"] = _("Burmese")
-        self._languages["nep"] = _("Nepali")
-        self._languages["nld"] = _("Dutch; Flemish")
-        self._languages["nor"] = _("Norwegian")
-        self._languages["oci"] = _("Occitan (post 1500)")
-        self._languages["ori"] = _("Oriya")
-        self._languages["osd"] = _("Orientation and script detection module")
-        self._languages["pan"] = _("Panjabi; Punjabi")
-        self._languages["pol"] = _("Polish")
-        self._languages["por"] = _("Portuguese")
-        self._languages["pus"] = _("Pushto; Pashto")
-        self._languages["que"] = _("Quechua")
-        self._languages["ron"] = _("Romanian; Moldavian; Moldovan")
-        self._languages["rus"] = _("Russian")
-        self._languages["san"] = _("Sanskrit")
-        self._languages["sin"] = _("Sinhala; Sinhalese")
-        self._languages["slk"] = _("Slovak")
-        self._languages["slv"] = _("Slovenian")
-        self._languages["snd"] = _("Sindhi")
-        self._languages["spa"] = _("Spanish; Castilian")
-        self._languages["spa_old"] = _("Spanish; Castilian - Old")
-        self._languages["sqi"] = _("Albanian")
-        self._languages["srp"] = _("Serbian")
-        self._languages["srp_latn"] = _("Serbian - Latin")
-        self._languages["sun"] = _("Sundanese")
-        self._languages["swa"] = _("Swahili")
-        self._languages["swe"] = _("Swedish")
-        self._languages["syr"] = _("Syriac")
-        self._languages["tam"] = _("Tamil")
-        self._languages["tat"] = _("Tatar")
-        self._languages["tel"] = _("Telugu")
-        self._languages["tgk"] = _("Tajik")
-        self._languages["tha"] = _("Thai")
-        self._languages["tir"] = _("Tigrinya")
-        self._languages["ton"] = _("Tonga")
-        self._languages["tur"] = _("Turkish")
-        self._languages["uig"] = _("Uighur; Uyghur")
-        self._languages["ukr"] = _("Ukrainian")
-        self._languages["urd"] = _("Urdu")
-        self._languages["uzb"] = _("Uzbek")
-        self._languages["uzb_cyrl"] = _("Uzbek - Cyrilic")
-        self._languages["vie"] = _("Vietnamese")
-        self._languages["yid"] = _("Yiddish")
-        self._languages["yor"] = _("Yoruba")
+    @cached_property
+    def _sorted_pairs(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted(((code, _(title)) for code, title in _LANGUAGES), key=itemgetter(1)))
+
+    @cached_property
+    def _languages(self) -> Dict[str, str]:
+        return dict(self._sorted_pairs)
+
+    @cached_property
+    def _codes_by_title(self) -> Dict[str, str]:
+        return {title: code for code, title in self._languages.items()}
+
+    @cached_property
+    def _items(self) -> Dict[str, LanguageItem]:
+        return {code: LanguageItem(code=code, title=title) for code, title in self._languages.items()}
+
+    @cached_property
+    def _available_codes(self) -> Tuple[str, ...]:
+        return tuple(code for code, title in self._sorted_pairs)
+
+    @cached_property
+    def _available_languages(self) -> Tuple[str, ...]:
+        return tuple(title for code, title in self._sorted_pairs)
 
     @staticmethod
     def init_tessdata() -> None:
-        if not os.path.exists(tessdata_dir):
-            os.mkdir(tessdata_dir)
+        os.makedirs(tessdata_dir, exist_ok=True)
 
         dest_path = os.path.join(tessdata_dir, 'eng.traineddata')
         source_path = pathlib.Path('/app/share/appdata/eng.traineddata')
-        if os.path.exists(dest_path):
+        # Hardlink when both paths are on the same filesystem, copy otherwise
+        try:
+            os.link(source_path, dest_path)
+        except FileExistsError:
             return
+        except OSError:
+            LanguageManager._copy_file(source_path, dest_path)
 
-        copyfile(source_path, dest_path)
+    @staticmethod
+    def _copy_file(source_path: os.PathLike, dest_path: str) -> None:
+        # Let the kernel copy the data, fall back to shutil if sendfile fails
+        try:
+            with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+        except OSError:
+            copyfile(source_path, dest_path)
 
     @GObject.Property(type=GObject.TYPE_PYOBJECT)
     def active_language(self) -> LanguageItem:
@@ -209,69 +281,134 @@ class LanguageManager(GObject.GObject):
         self._active_language = language
         self.notify('active_language')
 
-    def get_available_codes(self):
-        return [code for code in sorted(self._languages.keys(), key=lambda x: self.get_language(x))]
+    def get_available_codes(self) -> Tuple[str, ...]:
+        return self._available_codes
 
-    def get_available_languages(self):
-        return [code for code in sorted(self._languages.values())]
+    def get_available_languages(self) -> Tuple[str, ...]:
+        return self._available_languages
 
     def get_language(self, code: str) -> str:
         return self._languages.get(code)
 
     def get_language_item(self, code: str) -> LanguageItem:
-        return LanguageItem(code=code, title=self.get_language(code))
+        item = self._items.get(code)
+        if item is None:
+            item = LanguageItem(code=code, title=self.get_language(code))
+        return item
 
     def get_language_code(self, language: str) -> str:
-        for code, lang in self._languages.items():
-            if lang == language:
-                return code
-
-    def get_downloaded_codes(self, force: bool = False) -> List[str]:
-        if self._need_update_cache or force:
-            self._downloaded_codes = [os.path.splitext(lang_file)[0]
-                                      for lang_file in os.listdir(tessdata_dir)]
+        return self._codes_by_title.get(language)
+
+    def get_downloaded_codes(self, force: bool = False) -> Tuple[str, ...]:
+        # Files dropped into tessdata outside the app change the dir mtime
+        mtime = os.stat(tessdata_dir).st_mtime_ns
+        if self._need_update_cache or force or mtime != self._downloaded_mtime:
+            recognized_codes = []
+            with os.scandir(tessdata_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.traineddata') or not entry.is_file():
+                        continue
+                    code = entry.name.removesuffix('.traineddata')
+                    if code not in self._languages:
+                        logger.warning(f'Unrecognized language code: {code}')
+                        continue
+                    recognized_codes.append(code)
+
+            self._downloaded_codes = tuple(sorted(recognized_codes, key=self._languages.__getitem__))
+            self._downloaded_mtime = mtime
             self._need_update_cache = False
             logger.debug(f"Cache downloaded codes: {self._downloaded_codes}")
 
-        recognized_codes = []
-        for code in self._downloaded_codes:
-            if code not in self._languages:
-                logger.warning(f'Unrecognized language code: {code}')
-                continue
-            recognized_codes.append(code)
-
-        return sorted(recognized_codes, key=lambda x: self.get_language(x))
+        return self._downloaded_codes
 
     def get_downloaded_languages(self, force: bool = False) -> List[str]:
-        return sorted({self.get_language(code) for code in self.get_downloaded_codes(force)})
+        # Downloaded codes are unique and already sorted by title
+        return [self._languages[code] for code in self.get_downloaded_codes(force)]
 
     def download(self, code):
         self.emit('added', code)
         self.loading_languages[code] = DownloadState()
         self.emit('downloading', code, 0.1)
-        GObjectWorker.call(self.download_begin, (code,), self.download_done)
-
-    def download_begin(self, code):
+        future = self._executor.submit(self.download_begin, code)
+        future.add_done_callback(self._on_download_finished)
 
-        def update_progress(block_num, block_size, total_size):
-            progress = int(block_num * block_size * 100 / total_size)
-            self.emit('downloading', code, progress)
+    def _on_download_finished(self, future: Future) -> None:
+        # Called in the worker thread, hand the result over to the main loop
+        if not future.cancelled():
+            GLib.idle_add(self.download_done, future.result())
 
+    def download_begin(self, code):
         tessfile = f'{code}.traineddata'
         tessfile_path = os.path.join(tessdata_dir, tessfile)
         logger.debug(f'Data will be extracted to: {tessfile_path}')
         try:
-            request.urlretrieve(tessdata_best_url + tessfile, tessfile_path, update_progress)
+            # Fall back to tessdata only when tessdata_best has no such file,
+            # other failures should not be masked by a second download attempt
+            url = tessdata_best_url + tessfile
+            if self._pool.request('HEAD', url).status == 404:
+                logger.debug(f"{code} not found in tessdata_best, checking tessdata")
+                url = tessdata_url + tessfile
+
+            if self._shutting_down.is_set():
+                raise InterruptedError(f'Download of {code} was cancelled')
+
+            self._fetch(code, url, tessfile_path)
             return code
         except Exception as e:
-            logger.debug(e)
-            try:
-                logger.debug(f"{code} not found in tessdata_best, checking tessdata")
-                request.urlretrieve(tessdata_url + tessfile, tessfile_path)
-                return code
-            except Exception as e2:
-                logger.debug(e2)
-                logger.debug(f"{code} was not found at tessdata")
+            logger.error(f"Failed to download {code}: {e}")
+
+    def _fetch(self, code: str, url: str, path: str) -> None:
+        response = self._pool.request('GET', url, preload_content=False)
+        with self._responses_lock:
+            self._responses.add(response)
+        part_path = f'{path}.part'
+        try:
+            if response.status != 200:
+                raise urllib3.exceptions.HTTPError(f'{url} returned HTTP {response.status}')
+
+            total_size = int(response.headers.get('Content-Length', 0))
+            received = 0
+            # Limit progress signals to ~20 per second, the UI can't show more anyway
+            last_progress, last_emit = 0, 0.0
+            # Write next to the target and rename once complete, so a partial
+            # file never shows up as a downloaded language. A body shorter than
+            # Content-Length makes stream() raise, urllib3 enforces it by default.
+            with open(part_path, 'wb') as f:
+                for chunk in response.stream(64 * 1024):
+                    if self._shutting_down.is_set():
+                        raise InterruptedError(f'Download of {code} was cancelled')
+                    f.write(chunk)
+                    received += len(chunk)
+                    if not total_size:
+                        continue
+
+                    progress = int(received * 100 / total_size)
+                    now = time.monotonic()
+                    if progress != last_progress and (progress == 100 or now - last_emit >= 0.05):
+                        last_progress, last_emit = progress, now
+                        GLib.idle_add(self.emit, 'downloading', code, progress)
+
+            os.replace(part_path, path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            with self._responses_lock:
+                self._responses.discard(response)
+            response.release_conn()
+
+    def shutdown(self) -> None:
+        # Executor threads are joined at exit, so stop running downloads
+        self._shutting_down.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._responses_lock:
+            responses = list(self._responses)
+        for response in responses:
+            # HTTPResponse.shutdown() (urllib3 2.3+) wakes a blocked read, with
+            # older versions close() leaves it to the read timeout
+            getattr(response, 'shutdown', response.close)()
+        self._pool.clear()
 
     def download_done(self, code):
         self._need_update_cache = True
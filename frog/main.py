@@ -114,6 +114,10 @@ class FrogApplication(Adw.Application):
 
         self.settings.connect("changed", self.on_settings_changed)
 
+    def do_shutdown(self):
+        language_manager.shutdown()
+        Adw.Application.do_shutdown(self)
+
     def do_activate(self):
         win = self.props.active_window
         if not win:
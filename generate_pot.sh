@@ -5,7 +5,7 @@ function generate_po()
     >frog.pot
     for file in ../data/org.github.tenderowl.frog.gschema.xml ../data/*.in ../data/ui/*.blp ../frog/*.py ../frog/services/*.py ../frog/types/*.py ../frog/widgets/*.py
     do
-        xgettext --add-comments --keyword=_ --keyword=C_:1c,2 --from-code=UTF-8 -j $file -o frog.pot
+        xgettext --add-comments --keyword=_ --keyword=N_ --keyword=C_:1c,2 --from-code=UTF-8 -j $file -o frog.pot
     done
     >LINGUAS
     for po in *.po